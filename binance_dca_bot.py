@@ -1,29 +1,25 @@
 
+import functools
 import time
 import os
-from decimal import Decimal
-from typing import Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
 
 
+from binance import ThreadedWebsocketManager
 from binance.client import Client
 from binance.exceptions import BinanceAPIException
 
 
-def load_env(path: str = ".env") -> None:
-    """Load key=value pairs from a .env file into os.environ."""
-
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line or line.startswith("#") or "=" not in line:
-                    continue
-                key, value = line.split("=", 1)
-                os.environ.setdefault(key.strip(), value.strip())
-    except FileNotFoundError:
-        pass
-
-
+from binance_api import (
+    check_hash_backend,
+    create_client,
+    get_account,
+    get_min_notional,
+    throttled_call,
+)
+from env import load_env
 from telegram_bot import TelegramBot
 
 
@@ -33,38 +29,106 @@ MIN_NOTIONAL = 0.0
 def fetch_trade_rules(client: Client, symbol: str = "BTCEUR") -> None:
     """Retrieve trading rules such as minimum notional."""
     global MIN_NOTIONAL
-    try:
-        info = client.get_symbol_info(symbol)
-        if info:
-            for f in info.get("filters", []):
-                if f.get("filterType") == "MIN_NOTIONAL":
-                    MIN_NOTIONAL = float(f.get("minNotional", 0))
+    MIN_NOTIONAL = get_min_notional(client, symbol)
+
+
+class AccountSnapshot:
+    """Balances and open orders seeded via REST and kept fresh by the user-data stream."""
+
+    def __init__(self, symbol: str = "BTCEUR", assets: Tuple[str, ...] = ("BTC", "EUR")) -> None:
+        self.symbol = symbol
+        self.assets = assets
+        self.balances: Dict[str, Tuple[float, float]] = {}
+        self.open_orders: Dict[int, dict] = {}
+        self.can_trade = False
+        self.ready = False
+
+    def bootstrap(self, client: Client) -> None:
+        """Load balances and open orders with one /account and one /openOrders call."""
+        account = get_account(client)
+        orders = throttled_call("GET", "/api/v3/openOrders", client.get_open_orders, symbol=self.symbol)
+        balances = {}
+        for b in account.get("balances", ()):
+            if b["asset"] in self.assets:
+                balances[b["asset"]] = (float(b["free"]), float(b["locked"]))
+                if len(balances) == len(self.assets):
                     break
-    except Exception:
-        MIN_NOTIONAL = 0.0
-
-
-def get_min_notional(client: Client, symbol: str = "BTCEUR") -> float:
-    """Return the minimum notional for a symbol or 0."""
+        self.balances = balances
+        self.open_orders = {o["orderId"]: o for o in orders}
+        self.can_trade = bool(account.get("canTrade"))
+        self.ready = True
+
+    def consume(self, msg: dict) -> None:
+        """Apply a user-data stream event."""
+        event = msg.get("e")
+        if event == "outboundAccountPosition":
+            for b in msg.get("B", ()):
+                if b["a"] in self.assets:
+                    self.balances[b["a"]] = (float(b["f"]), float(b["l"]))
+        elif event == "executionReport" and msg.get("s") == self.symbol:
+            if msg.get("X") in ("NEW", "PARTIALLY_FILLED"):
+                self.open_orders[msg["i"]] = msg
+            else:
+                self.open_orders.pop(msg["i"], None)
+        elif event == "error":
+            # python-binance reconnects the socket but never resubscribes to the
+            # user-data stream, so no further events arrive: stay on REST.
+            self.ready = False
+
+    def total(self, asset: str) -> float:
+        free, locked = self.balances.get(asset, (0.0, 0.0))
+        return free + locked
+
+
+ACCOUNT = AccountSnapshot()
+
+
+def start_account_stream(client: Client) -> Optional[ThreadedWebsocketManager]:
+    """Subscribe ACCOUNT to the user-data stream.
+
+    python-binance only schedules the WebSocket API subscription here, so it
+    may land after the REST snapshot taken by bootstrap() and events in
+    between can be missed. Returns None if the manager cannot be started,
+    leaving ACCOUNT unset so the getters keep using REST.
+    """
+    twm = ThreadedWebsocketManager(api_key=client.API_KEY, api_secret=client.API_SECRET)
     try:
-        info = client.get_symbol_info(symbol)
-        if info:
-            for f in info.get("filters", []):
-                if f.get("filterType") == "MIN_NOTIONAL":
-                    return float(f.get("minNotional", 0))
-    except Exception:
-        pass
-    return 0.0
-
-
-def create_client(api_key: str, api_secret: str) -> Client:
-    """Create a Binance Client instance."""
-    return Client(api_key, api_secret)
+        twm.start()
+        twm.start_user_socket(callback=ACCOUNT.consume)
+    except RuntimeError as e:
+        print("User-data stream unavailable, using REST:", e)
+        twm.stop()
+        return None
+    return twm
+
+
+def bootstrap(client: Client, symbol: str = "BTCEUR") -> Optional[ThreadedWebsocketManager]:
+    """Open the user-data stream while fetching trade rules and the account snapshot.
+
+    Only the websocket handshake runs on a worker thread: REST calls stay on
+    the calling thread, one at a time on the shared client.
+    """
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        stream = pool.submit(start_account_stream, client)
+        fetch_trade_rules(client, symbol)
+        twm = stream.result()
+    if twm:
+        try:
+            ACCOUNT.bootstrap(client)
+        except Exception:
+            # The manager thread is not a daemon: stop it or the process hangs.
+            twm.stop()
+            raise
+    return twm
 
 
 def get_eur_balance(client: Client) -> float:
-    """Return the available EUR balance (free funds)."""
-    account = client.get_account()
+    """Return the available EUR balance (free funds).
+
+    Always read via REST: it sizes the next order, and a silently dropped
+    user-data subscription would leave ACCOUNT stale.
+    """
+    account = get_account(client)
     for b in account.get("balances", []):
 
         if b["asset"] == "EUR":
@@ -72,30 +136,65 @@ def get_eur_balance(client: Client) -> float:
     return 0.0
 
 
+def _round_cents(x: float) -> float:
+    """Round a positive amount to two decimals using integer arithmetic."""
+    return int(x * 100 + 0.5) / 100.0
+
+
+_BUY_TEMPLATE = {"symbol": "BTCEUR", "side": "BUY", "type": "MARKET"}
+
+
 def buy_bitcoin_eur(amount_eur: float, client: Client):
     """Place a market buy order on the BTCEUR pair."""
-    qty = float(Decimal(amount_eur).quantize(Decimal("0.01")))
-    return client.create_order(
-        symbol="BTCEUR",
-        side="BUY",
-        type="MARKET",
-        quoteOrderQty=qty,
+    payload = _BUY_TEMPLATE.copy()
+    payload["quoteOrderQty"] = _round_cents(amount_eur)
+    order = throttled_call("POST", "/api/v3/order", client.create_order, **payload)
+    _SUMMARY_CACHE.pop(client.API_KEY[:8], None)
+    return order
 
-    )
+
+SUMMARY_TTL = 5.0
+# (expiry, summary) of the REST fallback, keyed on the API key prefix
+_SUMMARY_CACHE: Dict[str, Tuple[float, str]] = {}
 
 
 def get_account_summary(client: Client) -> str:
     """Return a short summary of BTC and EUR balances and open orders."""
-    account = client.get_account()
-    balances = {b["asset"]: (float(b["free"]) + float(b["locked"])) for b in account.get("balances", [])}
-    btc = balances.get("BTC", 0.0)
-    eur = balances.get("EUR", 0.0)
-    orders = client.get_open_orders(symbol="BTCEUR")
-    return f"BTC: {btc} | EUR: {eur} | Ordres en cours: {len(orders)}"
-
-
-
-PAUSED = False
+    if ACCOUNT.ready:
+        btc = ACCOUNT.total("BTC")
+        eur = ACCOUNT.total("EUR")
+        return f"BTC: {btc} | EUR: {eur} | Ordres en cours: {len(ACCOUNT.open_orders)}"
+    key = client.API_KEY[:8]
+    cached = _SUMMARY_CACHE.get(key)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    account = get_account(client)
+    btc = eur = 0.0
+    found = 0
+    for b in account.get("balances", ()):
+        asset = b["asset"]
+        if asset == "BTC":
+            btc = float(b["free"]) + float(b["locked"])
+            found += 1
+        elif asset == "EUR":
+            eur = float(b["free"]) + float(b["locked"])
+            found += 1
+        if found == 2:
+            break
+    orders = throttled_call("GET", "/api/v3/openOrders", client.get_open_orders, symbol="BTCEUR")
+    summary = f"BTC: {btc} | EUR: {eur} | Ordres en cours: {len(orders)}"
+    _SUMMARY_CACHE[key] = (time.monotonic() + SUMMARY_TTL, summary)
+    return summary
+
+
+
+# Set while the bot is running, cleared on "pause".
+_RUN = threading.Event()
+_RUN.set()
+
+# Telegram I/O runs here so a slow API call never stalls the trading loop.
+# A single worker keeps messages and log lines in submission order.
+_TG_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tg")
 
 
 def dollar_cost_average(
@@ -110,102 +209,138 @@ def dollar_cost_average(
     next_time = time.time()
     for i in range(iterations):
         while True:
-            if not PAUSED and time.time() >= next_time:
+            _RUN.wait()
+            remaining = next_time - time.time()
+            if remaining <= 0:
                 break
-            time.sleep(1)
+            time.sleep(remaining)
         if MIN_NOTIONAL == 0:
             fetch_trade_rules(client)
 
         amount_eur = get_eur_balance(client) * budget_ratio
         if MIN_NOTIONAL and amount_eur < MIN_NOTIONAL:
             if telegram:
-                telegram.send_message(
+                _TG_POOL.submit(
+                    telegram.send_message,
                     f"Montant {amount_eur:.2f} EUR < minimum {MIN_NOTIONAL} EUR, achat ignor\u00e9"
                 )
-                telegram.log("skip too small")
+                _TG_POOL.submit(telegram.log, "skip too small")
             next_time += interval_sec
             continue
 
         if telegram:
-            telegram.send_message(
+            _TG_POOL.submit(
+                telegram.send_message,
                 f"Achat {i + 1}/{iterations} de {amount_eur:.2f} EUR de BTC"
             )
-            telegram.log(f"buy {amount_eur:.2f} EUR")
+            _TG_POOL.submit(telegram.log, f"buy {amount_eur:.2f} EUR")
         try:
-            response = buy_bitcoin_eur(float(Decimal(amount_eur).quantize(Decimal('0.01'))), client)
+            response = buy_bitcoin_eur(_round_cents(amount_eur), client)
             print("Order response:", response)
         except BinanceAPIException as e:
             print("Binance error:", e)
             if telegram:
-                telegram.send_message(f"Erreur lors de l'achat: {e.message}")
+                _TG_POOL.submit(telegram.send_message, f"Erreur lors de l'achat: {e.message}")
                 if "NOTIONAL" in e.message.upper() and MIN_NOTIONAL == 0:
-                    telegram.send_message("R\u00e9cup\u00e9ration du minimum d'achat et nouvelle tentative la prochaine fois")
+                    _TG_POOL.submit(telegram.send_message, "R\u00e9cup\u00e9ration du minimum d'achat et nouvelle tentative la prochaine fois")
         except Exception as e:
             print("Unexpected error:", e)
 
             if telegram:
-                telegram.send_message(f"Erreur lors de l'achat: {e}")
+                _TG_POOL.submit(telegram.send_message, f"Erreur lors de l'achat: {e}")
         next_time += interval_sec
 
 
+@functools.lru_cache(maxsize=8)
+def _recent_logs_cached(telegram: TelegramBot, days: int, _ts_bucket: int) -> str:
+    return telegram.recent_logs(days)
+
+
+def _cmd_pause(client: Client, telegram: TelegramBot) -> None:
+    _RUN.clear()
+    _TG_POOL.submit(telegram.send_message, "Programme en pause")
+    _TG_POOL.submit(telegram.log, "pause")
+
+
+def _cmd_resume(client: Client, telegram: TelegramBot) -> None:
+    if not _RUN.is_set():
+        _RUN.set()
+        _recent_logs_cached.cache_clear()
+        _TG_POOL.submit(telegram.send_message, "Programme repris")
+        _TG_POOL.submit(telegram.log, "resume")
+
+
+def _cmd_status(client: Client, telegram: TelegramBot) -> None:
+    _TG_POOL.submit(telegram.send_message, get_account_summary(client))
+
+
+def _cmd_help(client: Client, telegram: TelegramBot) -> None:
+    _TG_POOL.submit(
+        telegram.send_message,
+        "Commandes:\n"
+        "pause - met le programme en pause\n"
+        "reprendre - relance le programme\n"
+        "status - affiche le statut\n"
+        "log X - log des X derniers jours\n"
+        "help - cette aide"
+    )
+
+
+def _cmd_log(cmd: str, telegram: TelegramBot) -> None:
+    parts = cmd.split()
+    days = 1
+    if len(parts) > 1 and parts[1].isdigit():
+        days = int(parts[1])
+    logs = _recent_logs_cached(telegram, days, int(time.monotonic()) // 30)
+    _TG_POOL.submit(telegram.send_message, logs)
+
+
+_COMMANDS = {
+    "pause": _cmd_pause,
+    "reprendre": _cmd_resume,
+    "resume": _cmd_resume,
+    "status": _cmd_status,
+    "aide": _cmd_help,
+    "help": _cmd_help,
+}
+
+
 def handle_command(text: str, client: Client, telegram: TelegramBot):
-    global PAUSED
     cmd = text.strip().lower()
-
-    if cmd == "pause":
-        PAUSED = True
-        telegram.send_message("Programme en pause")
-        telegram.log("pause")
-    elif cmd in ("reprendre", "resume"):
-        if PAUSED:
-            PAUSED = False
-            telegram.send_message("Programme repris")
-            telegram.log("resume")
-    elif cmd == "status":
-        telegram.send_message(get_account_summary(client))
-
-    elif cmd.startswith("log"):
-        parts = cmd.split()
-        days = 1
-        if len(parts) > 1 and parts[1].isdigit():
-            days = int(parts[1])
-        telegram.send_message(telegram.recent_logs(days))
-
-    elif cmd in ("aide", "help"):
-        telegram.send_message(
-            "Commandes:\n"
-            "pause - met le programme en pause\n"
-            "reprendre - relance le programme\n"
-            "status - affiche le statut\n"
-            "log X - log des X derniers jours\n"
-            "help - cette aide"
-        )
+    if cmd.startswith("log"):
+        _cmd_log(cmd, telegram)
+        return
+    words = cmd.split(maxsplit=1)
+    fn = _COMMANDS.get(words[0]) if words else None
+    if fn:
+        fn(client, telegram)
 
 
 if __name__ == "__main__":
     # Load environment variables from .env if available
 
     load_env()
+    check_hash_backend()
     API_KEY = os.getenv("BINANCE_API_KEY")
     API_SECRET = os.getenv("BINANCE_API_SECRET")
     if not API_KEY or not API_SECRET:
         raise SystemExit("Please set BINANCE_API_KEY and BINANCE_API_SECRET environment variables")
 
     client = create_client(API_KEY, API_SECRET)
-    fetch_trade_rules(client)
+    streams = bootstrap(client)
 
     TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 
     TELEGRAM_CHAT = os.getenv("TELEGRAM_CHAT_ID")
     telegram = None
-    if TELEGRAM_TOKEN and TELEGRAM_CHAT:
-        telegram = TelegramBot(TELEGRAM_TOKEN, TELEGRAM_CHAT)
-        telegram.log("start")
-        telegram.send_message(f"Bot lancé. {get_account_summary(client)}")
-        telegram.start_polling(lambda text: handle_command(text, client, telegram))
-
 
     try:
+        if TELEGRAM_TOKEN and TELEGRAM_CHAT:
+            telegram = TelegramBot(TELEGRAM_TOKEN, TELEGRAM_CHAT)
+            telegram.log("start")
+            telegram.send_message(f"Bot lancé. {get_account_summary(client)}")
+            telegram.start_polling(lambda text: handle_command(text, client, telegram))
+
         # Example: invest 10% of EUR balance every week for 10 weeks
         dollar_cost_average(
             budget_ratio=0.10,
@@ -216,7 +351,10 @@ if __name__ == "__main__":
             telegram=telegram,
         )
     finally:
+        if streams:
+            streams.stop()
         if telegram:
+            _TG_POOL.shutdown(wait=True)
             telegram.send_message(f"Bot arrêté. {get_account_summary(client)}")
             telegram.log("stop")
             telegram.stop_polling()
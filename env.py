@@ -0,0 +1,21 @@
+"""Load ``.env`` files shared by the Binance bots."""
+
+import os
+import re
+
+# key=value lines; keys cannot be empty or start with "#" (comments).
+_ENV_RE = re.compile(r"^[ \t]*([^#=\s][^=\r\n]*?)[ \t]*=[ \t]*(.*?)[ \t]*\r?$", re.MULTILINE)
+
+
+def load_env(path: str = ".env") -> None:
+    """Load key=value pairs from a .env file into os.environ."""
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            text = f.read()
+    except FileNotFoundError:
+        return
+    updates = {}
+    for key, value in _ENV_RE.findall(text):
+        updates.setdefault(key, value)
+    for key, value in updates.items():
+        os.environ.setdefault(key, value)
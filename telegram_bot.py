@@ -1,11 +1,17 @@
 
+import http.client
+import mmap
+import os
 import urllib.parse
-import urllib.request
-import json
 import time
 import threading
 from datetime import datetime, timedelta
 
+try:
+    from orjson import loads as json_loads
+except ImportError:  # orjson is optional
+    from json import loads as json_loads
+
 
 class TelegramBot:
     def __init__(self, token: str, chat_id: str, log_file: str = "bot.log"):
@@ -13,24 +19,68 @@ class TelegramBot:
         self.token = token
         self.chat_id = chat_id
         self.api_url = f"https://api.telegram.org/bot{token}"
+        self._api_path = f"/bot{token}"
+        self._local = threading.local()
         self.log_file = log_file
         self.offset = None
 
         self._polling_thread = None
         self._stop_event = threading.Event()
+        self._log_fp = None
+        self._log_lock = threading.Lock()
 
     def log(self, message: str):
 
-        timestamp = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-        with open(self.log_file, "a", encoding="utf-8") as f:
-            f.write(f"{timestamp} - {message}\n")
+        # Continuation lines are indented so recent_logs() never takes them for
+        # entries (a "log" reply echoes older timestamped lines).
+        message = message.replace("\n", "\n  ")
+        line = f"{datetime.utcnow().isoformat(' ', 'seconds')} - {message}\n"
+        with self._log_lock:
+            if self._log_fp is None:
+                # Kept open (line-buffered) instead of reopening on every entry.
+                self._log_fp = open(self.log_file, "a", encoding="utf-8", buffering=1)
+            self._log_fp.write(line)
+
+    def close(self):
+
+        with self._log_lock:
+            if self._log_fp is not None:
+                self._log_fp.close()
+                self._log_fp = None
+
+    def _request(self, method: str, path: str, body: bytes = None, timeout: float = 10) -> bytes:
+        """Send a request over this thread's keep-alive connection to the API."""
+        headers = {"Content-Type": "application/x-www-form-urlencoded"} if body else {}
+        for attempt in range(2):
+            conn = getattr(self._local, "conn", None)
+            if conn is None:
+                conn = http.client.HTTPSConnection("api.telegram.org", timeout=timeout)
+                self._local.conn = conn
+            else:
+                # The connection is reused by calls with different timeouts
+                # (long polling vs. sends).
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+            try:
+                conn.request(method, f"{self._api_path}{path}", body=body, headers=headers)
+                resp = conn.getresponse()
+                data = resp.read()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                # Stale keep-alive socket: reconnect once.
+                conn.close()
+                self._local.conn = None
+                if attempt:
+                    raise
+        if resp.status >= 400:
+            raise http.client.HTTPException(f"Telegram API error {resp.status}: {data[:200]!r}")
+        return data
 
     def send_message(self, text: str):
 
         data = urllib.parse.urlencode({"chat_id": self.chat_id, "text": text}).encode()
-        req = urllib.request.Request(f"{self.api_url}/sendMessage", data=data)
-        with urllib.request.urlopen(req) as resp:
-            resp.read()
+        self._request("POST", "/sendMessage", body=data)
         self.log(f"sent: {text}")
 
     def get_updates(self):
@@ -38,9 +88,9 @@ class TelegramBot:
         params = {"timeout": 100}
         if self.offset:
             params["offset"] = self.offset
-        url = f"{self.api_url}/getUpdates?{urllib.parse.urlencode(params)}"
-        with urllib.request.urlopen(url) as resp:
-            data = json.load(resp)
+        # The read timeout must outlast the server-side long poll.
+        raw = self._request("GET", f"/getUpdates?{urllib.parse.urlencode(params)}", timeout=105)
+        data = json_loads(raw)
         if data.get("ok"):
             for update in data.get("result", []):
                 self.offset = update["update_id"] + 1
@@ -66,22 +116,38 @@ class TelegramBot:
         self._stop_event.set()
         if self._polling_thread:
             self._polling_thread.join(timeout=1)
+        self.close()
 
     def recent_logs(self, days: int) -> str:
 
         cutoff = datetime.utcnow() - timedelta(days=days)
         lines = []
         try:
-            with open(self.log_file, "r", encoding="utf-8") as f:
-                for line in f:
-                    try:
-                        ts_str, rest = line.split(" - ", 1)
-                        ts = datetime.strptime(ts_str, "%Y-%m-%d %H:%M:%S")
-                        if ts >= cutoff:
-                            lines.append(line.strip())
-                    except ValueError:
-                        continue
+            with open(self.log_file, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return "No recent logs."
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    # Entries are appended in time order: read from the tail and
+                    # stop at the first one older than the cutoff.
+                    end = len(mm)
+                    while end > 0:
+                        start = mm.rfind(b"\n", 0, end - 1) + 1
+                        raw = mm[start:end]
+                        end = start
+                        if raw[:1].isspace():
+                            continue  # continuation of a multi-line entry
+                        line = raw.decode("utf-8", "replace").strip()
+                        ts_str, sep, _ = line.partition(" - ")
+                        if not sep:
+                            continue
+                        try:
+                            ts = datetime.fromisoformat(ts_str)
+                        except ValueError:
+                            continue
+                        if ts < cutoff:
+                            break
+                        lines.append(line)
         except FileNotFoundError:
             return "No logs found."
-        return "\n".join(lines) if lines else "No recent logs." 
-
+        lines.reverse()
+        return "\n".join(lines) if lines else "No recent logs."
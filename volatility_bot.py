@@ -3,46 +3,24 @@ import json
 import time
 import threading
 import logging
+from collections import deque
 from datetime import datetime, timedelta
 
-MIN_NOTIONAL = 0.0
-
+from binance import ThreadedWebsocketManager
 from binance.client import Client
 from binance.exceptions import BinanceAPIException
-from typing import Optional
-
-
-def load_env(path: str = ".env") -> None:
-    """Load key=value pairs from a .env file into os.environ."""
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line or line.startswith("#") or "=" not in line:
-                    continue
-                key, value = line.split("=", 1)
-                os.environ.setdefault(key.strip(), value.strip())
-    except FileNotFoundError:
-        pass
-
-
-
-def get_min_notional(client: Client, symbol: str) -> float:
-    try:
-        info = client.get_symbol_info(symbol)
-        if info:
-            for f in info.get("filters", []):
-                if f.get("filterType") == "MIN_NOTIONAL":
-                    return float(f.get("minNotional", 0))
-    except Exception:
-        pass
-    return 0.0
+from typing import Deque, Dict, Optional, Tuple
 
+from binance_api import create_client, get_min_notional, throttled_call
+from env import load_env
 
 
 class VolatilityBot(threading.Thread):
     """Monitor BTC/EUR price and buy if it drops more than 3%."""
 
+    # Seconds after which the streamed price is ignored (the ticker pushes every second).
+    PRICE_MAX_AGE = 10.0
+
     def __init__(
         self,
         api_key: str,
@@ -55,35 +33,102 @@ class VolatilityBot(threading.Thread):
         lookback_hours: int = 12,
     ) -> None:
         super().__init__(daemon=True)
-        self.client = Client(api_key, api_secret)
+        self.client = create_client(api_key, api_secret)
         self.symbol = symbol
         self.euro_amount = euro_amount
         self.log_file = log_file
         self.record_file = record_file
         self.check_interval = check_interval
         self.lookback_hours = lookback_hours
+        self._order_template = {"symbol": symbol, "side": "BUY", "type": "MARKET"}
         self._stop_event = threading.Event()
+        self._price_event = threading.Event()
+        self._streams = None
+        self.last_price = 0.0
+        self._price_ts = 0.0
+        self._price_then = 0.0
+        self._kline_cache: Dict[Tuple[str, str, int], Tuple[float, list]] = {}
+        # (open_time, open, close) of the last lookback_hours + 1 hourly candles
+        self._candles: Deque[Tuple[int, float, float]] = deque(maxlen=lookback_hours + 1)
+        # Shared between the kline websocket callback and the bot thread.
+        self._candles_lock = threading.Lock()
         logging.basicConfig(
             filename=self.log_file,
             level=logging.INFO,
             format="%(asctime)s - %(message)s",
         )
-        self._fetch_trade_rules()
+        self.min_notional = get_min_notional(self.client, self.symbol)
 
 
     def stop(self) -> None:
         self._stop_event.set()
+        self._price_event.set()
+        if self._streams:
+            self._streams.stop()
 
-    def _fetch_trade_rules(self) -> None:
-        """Retrieve minimum notional required for trading."""
-        global MIN_NOTIONAL
-        MIN_NOTIONAL = get_min_notional(self.client, self.symbol)
+    def _start_streams(self) -> None:
+        """Keep ``last_price`` and the hourly candles updated from websockets."""
+        self._streams = ThreadedWebsocketManager()
+        self._streams.start()
+        self._streams.start_symbol_ticker_socket(callback=self._on_ticker, symbol=self.symbol)
+        self._streams.start_kline_socket(
+            callback=self._on_kline, symbol=self.symbol, interval=Client.KLINE_INTERVAL_1HOUR
+        )
+
+    def _on_ticker(self, msg: dict) -> None:
+        event = msg.get("e")
+        if event == "24hrTicker":
+            self._price_ts = time.monotonic()
+            self.last_price = float(msg["c"])
+            self._price_event.set()
+        elif event == "error":
+            self.last_price = 0.0
+
+    def _streamed_price(self) -> float:
+        """Return the streamed last price, or 0.0 if it is missing or stale."""
+        if time.monotonic() - self._price_ts > self.PRICE_MAX_AGE:
+            return 0.0
+        return self.last_price
+
+    def _on_kline(self, msg: dict) -> None:
+        event = msg.get("e")
+        if event == "kline":
+            k = msg["k"]
+            candle = (k["t"], float(k["o"]), float(k["c"]))
+            with self._candles_lock:
+                if self._candles and self._candles[-1][0] == k["t"]:
+                    self._candles[-1] = candle
+                elif not self._candles or k["t"] > self._candles[-1][0]:
+                    self._candles.append(candle)
+        elif event == "error":
+            with self._candles_lock:
+                self._candles.clear()
 
+    def _candle_window(self) -> list:
+        """Return the hourly candles of the lookback window, backfilling via REST.
+
+        The streamed window is used only when it is full, contiguous and ends
+        with the current hour; otherwise (cold start, reconnect gap, stalled
+        stream) it is reseeded from REST.
+        """
+        with self._candles_lock:
+            window = list(self._candles)
+        span = self.lookback_hours * 3600 * 1000
+        current_hour = int(time.time() * 1000) // 3_600_000 * 3_600_000
+        if (len(window) == self._candles.maxlen and window[-1][0] == current_hour
+                and window[-1][0] - window[0][0] == span):
+            return window
+        klines = self._get_klines(Client.KLINE_INTERVAL_1HOUR, self.lookback_hours + 1)
+        window = [(k[0], float(k[1]), float(k[4])) for k in klines]
+        with self._candles_lock:
+            self._candles.clear()
+            self._candles.extend(window)
+        return window
 
     # Connection check
     def api_connected(self) -> bool:
         try:
-            self.client.ping()
+            throttled_call("GET", "/api/v3/ping", self.client.ping)
             return True
         except Exception as e:
             logging.error("API connection failed: %s", e)
@@ -103,56 +148,86 @@ class VolatilityBot(threading.Thread):
         with open(self.record_file, "w", encoding="utf-8") as f:
             json.dump({"last_purchase": date_obj.strftime("%Y-%m-%d")}, f)
 
+    def _get_klines(self, interval: str, limit: int) -> list:
+        """Return klines, reusing the last response until its latest candle closes."""
+        key = (self.symbol, interval, limit)
+        cached = self._kline_cache.get(key)
+        if cached and time.time() < cached[0]:
+            return cached[1]
+        klines = throttled_call(
+            "GET", "/api/v3/klines", self.client.get_klines, symbol=self.symbol, interval=interval, limit=limit
+        )
+        if klines:
+            self._kline_cache[key] = (klines[-1][6] / 1000, klines)
+        return klines
+
+    def _rest_price(self) -> float:
+        """Return the close of the in-progress hourly candle, bypassing the kline cache."""
+        klines = throttled_call(
+            "GET", "/api/v3/klines", self.client.get_klines,
+            symbol=self.symbol, interval=Client.KLINE_INTERVAL_1HOUR, limit=1,
+        )
+        return float(klines[-1][4])
+
     def _should_buy(self) -> bool:
         try:
-            klines = self.client.get_klines(
-                symbol=self.symbol,
-                interval=Client.KLINE_INTERVAL_1HOUR,
-                limit=self.lookback_hours + 1,
-            )
-            if len(klines) < self.lookback_hours + 1:
+            candles = self._candle_window()
+            if len(candles) < self.lookback_hours + 1:
                 logging.warning("Not enough kline data returned")
                 return False
-            price_then = float(klines[0][1])  # open price 12 hours ago
-            price_now = float(klines[-1][4])  # last closing price
-            drop = (price_now - price_then) / price_then
-            logging.info("Price %.2f -> %.2f (%.2f%%)", price_then, price_now, drop * 100)
-            return drop <= -0.03
+            price_then = candles[0][1]  # open price 12 hours ago
+            # fresh streamed last price, else the current close from REST (the
+            # cached window's last close may be up to an hour old)
+            price_now = self._streamed_price() or self._rest_price()
+            self._price_then = price_then
+            if logging.getLogger().isEnabledFor(logging.INFO):
+                drop = (price_now - price_then) / price_then
+                logging.info("Price %.2f -> %.2f (%.2f%%)", price_then, price_now, drop * 100)
+            # drop <= -3% without the division
+            return price_now * 100 <= price_then * 97
         except BinanceAPIException as e:
             logging.error("Binance API error during kline fetch: %s", e)
         except Exception as e:
             logging.error("Unexpected error during kline fetch: %s", e)
         return False
 
+    def _below_min_notional(self) -> bool:
+        if self.min_notional and self.euro_amount < self.min_notional:
+            logging.info(
+                "Amount %.2f EUR below minimum %.2f EUR, skipping", self.euro_amount, self.min_notional
+            )
+            return True
+        return False
+
+    def _place_order(self):
+        payload = self._order_template.copy()
+        payload["quoteOrderQty"] = float(round(self.euro_amount, 2))
+        return throttled_call("POST", "/api/v3/order", self.client.create_order, **payload)
+
     def _buy(self):
         try:
-            if MIN_NOTIONAL == 0:
-                self._fetch_trade_rules()
-
-            if MIN_NOTIONAL and self.euro_amount < MIN_NOTIONAL:
-                logging.info(
-                    "Amount %.2f EUR below minimum %.2f EUR, skipping", self.euro_amount, MIN_NOTIONAL
-                )
+            if self._below_min_notional():
                 return
-
-            order = self.client.create_order(
-                symbol=self.symbol,
-                side="BUY",
-                type="MARKET",
-                quoteOrderQty=float(round(self.euro_amount, 2)),
-
-            )
+            try:
+                order = self._place_order()
+            except BinanceAPIException as e:
+                if "NOTIONAL" not in str(e).upper():
+                    raise
+                # The cached minimum is stale: refresh it once and retry.
+                logging.info("Refreshing min notional after error: %s", e)
+                self.min_notional = get_min_notional(self.client, self.symbol, refresh=True)
+                if self._below_min_notional():
+                    return
+                order = self._place_order()
             logging.info("Bought %s: %s", self.symbol, order)
             self._set_last_purchase_date(datetime.utcnow().date())
         except BinanceAPIException as e:
             logging.error("Binance API error during buy: %s", e)
-            if "NOTIONAL" in str(e).upper() and MIN_NOTIONAL == 0:
-                logging.info("Retrying next time after retrieving min notional")
-
         except Exception as e:
             logging.error("Unexpected error during buy: %s", e)
 
     def check_market(self):
+        self._price_then = 0.0
         if not self.api_connected():
             return
         today = datetime.utcnow().date()
@@ -165,13 +240,42 @@ class VolatilityBot(threading.Thread):
         else:
             logging.info("No purchase condition met")
 
+    def _wait_next_check(self, armed: bool) -> bool:
+        """Sleep until the next check; return True if woken early by a price drop.
+
+        When ``armed``, the streamed price is compared on every ticker push
+        against the 3% threshold of the last kline check.
+        """
+        trigger = self._price_then * 0.97 if armed else 0.0
+        deadline = time.monotonic() + self.check_interval
+        while not self._stop_event.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if not trigger:
+                self._stop_event.wait(remaining)
+                continue
+            self._price_event.clear()
+            price = self._streamed_price()
+            if 0 < price <= trigger:
+                logging.info("Streamed price %.2f crossed %.2f", price, trigger)
+                return True
+            self._price_event.wait(remaining)
+        return False
+
     def run(self) -> None:
+        try:
+            self._start_streams()
+        except RuntimeError as e:
+            # Without streams every check falls back to REST klines.
+            logging.error("Websocket streams unavailable, using REST: %s", e)
+            self._streams.stop()
+            self._streams = None
+        armed = True
         while not self._stop_event.is_set():
             self.check_market()
-            for _ in range(self.check_interval):
-                if self._stop_event.is_set():
-                    break
-                time.sleep(1)
+            # An early wake-up disarms the trigger until the next scheduled check.
+            armed = not self._wait_next_check(armed)
 
 
 def start_volatility_bot(api_key: str, api_secret: str) -> VolatilityBot: